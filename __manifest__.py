@@ -19,16 +19,19 @@
         'stock',
         'mrp',
         'mail',
+        'bus',
         'web',
     ],
 
     'data': [
         'security/ir.model.access.csv',
+        'security/ops_security.xml',
         'data/cron.xml',
         'data/mail_activity_types.xml',
         'data/ops_stages.xml',
         'data/shipping_product.xml',
         'views/menu.xml',
+        'views/ops_delivery_forecast_views.xml',
         'views/ops_manufacturing_setting_views.xml',
         'views/ops_shipping_carrier_views.xml',
         'views/ops_stage_views.xml',
@@ -40,7 +43,11 @@
         'views/sale_order_list.xml',
     ],
 
-    'assets': {},
+    'assets': {
+        'web.assets_backend': [
+            'sale_ops_pipeline/static/src/**/*',
+        ],
+    },
 
     'post_init_hook': 'post_init_hook',
     'application': True,
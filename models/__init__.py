@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+from . import ir_websocket
+from . import ops_delivery_forecast
 from . import ops_manufacturing_setting
 from . import ops_shipping_carrier
 from . import ops_stage
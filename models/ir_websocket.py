@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from odoo import models
+
+from .sale_order import OPS_BUS_CHANNEL
+
+
+class IrWebsocket(models.AbstractModel):
+    _inherit = "ir.websocket"
+
+    def _build_bus_channel_list(self, channels):
+        # قنوات خط العمليات (sale_ops_pipeline_<company_id>) فقط لشركات المستخدم
+        prefix = "%s_" % OPS_BUS_CHANNEL
+        allowed = set()
+        if self.env.uid and self.env.user._is_internal():
+            allowed = {"%s%s" % (prefix, cid) for cid in self.env.user.company_ids.ids}
+        channels = [
+            c for c in channels
+            if not (isinstance(c, str) and c.startswith(prefix)) or c in allowed
+        ]
+        return super()._build_bus_channel_list(channels)
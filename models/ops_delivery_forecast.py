@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import api, fields, models, tools
+
+_logger = logging.getLogger(__name__)
+
+_OPS_FORECAST_PRECOMMIT_KEY = "sale_ops_pipeline.forecast"
+
+# مفتاح السطر: (تاريخ التوصيل، المدينة، شركة الشحن، الشركة) — NULL يُطبع لـ '' / 0
+# يطابق الفهرس الفريد ops_delivery_forecast_key_uniq
+_KEY_SQL = "(so.kanban_delivery_date, COALESCE(so.kanban_city, ''), COALESCE(so.shipping_carrier_id, 0), so.company_id)"
+_KEY_INDEX = ["delivery_date", "(COALESCE(city, ''))", "(COALESCE(carrier_id, 0))", "company_id"]
+
+# الطلبات المحسوبة في التوقع
+_COUNTED_SQL = "so.state = 'sale' AND so.ops_is_open AND so.kanban_delivery_date IS NOT NULL"
+
+_CONTRIBUTION_SQL = """
+    SELECT %s, so.shipping_type, COALESCE(so.ops_product_qty, 0), COALESCE(so.ops_shipping_cost_estimate, 0)
+      FROM sale_order so
+     WHERE so.id IN %%s AND %s
+""" % (_KEY_SQL[1:-1], _COUNTED_SQL)
+
+_AGGREGATE_SQL = """
+    INSERT INTO ops_delivery_forecast (
+        delivery_date, city, shipping_type, carrier_id, company_id,
+        order_count, product_qty, shipping_cost,
+        create_uid, create_date, write_uid, write_date
+    )
+    SELECT so.kanban_delivery_date, NULLIF(COALESCE(so.kanban_city, ''), ''), MAX(so.shipping_type),
+           NULLIF(COALESCE(so.shipping_carrier_id, 0), 0), so.company_id,
+           COUNT(*), COALESCE(SUM(so.ops_product_qty), 0), COALESCE(SUM(so.ops_shipping_cost_estimate), 0),
+           %%(uid)s, (now() at time zone 'UTC'), %%(uid)s, (now() at time zone 'UTC')
+      FROM sale_order so
+     WHERE %s
+  GROUP BY %s
+""" % (_COUNTED_SQL, _KEY_SQL[1:-1])
+
+# فروقات لكل مفتاح: أسطر مشتركة بين معاملات متزامنة، فلا DELETE+INSERT.
+# تعارض معاملتين على نفس السطر يعطي serialization failure (يعاد تلقائياً) بدلاً من أسطر مكررة.
+_UPSERT_SQL = """
+    INSERT INTO ops_delivery_forecast AS f (
+        delivery_date, city, shipping_type, carrier_id, company_id,
+        order_count, product_qty, shipping_cost,
+        create_uid, create_date, write_uid, write_date
+    )
+    VALUES (%%(date)s, NULLIF(%%(city)s, ''), %%(shipping_type)s, NULLIF(%%(carrier)s, 0), %%(company)s,
+            %%(count)s, %%(qty)s, %%(cost)s,
+            %%(uid)s, (now() at time zone 'UTC'), %%(uid)s, (now() at time zone 'UTC'))
+    ON CONFLICT (%s) DO UPDATE
+       SET order_count = f.order_count + EXCLUDED.order_count,
+           product_qty = f.product_qty + EXCLUDED.product_qty,
+           shipping_cost = f.shipping_cost + EXCLUDED.shipping_cost,
+           shipping_type = COALESCE(EXCLUDED.shipping_type, f.shipping_type),
+           write_uid = EXCLUDED.write_uid,
+           write_date = EXCLUDED.write_date
+""" % ", ".join(_KEY_INDEX)
+
+
+class OpsDeliveryForecast(models.Model):
+    _name = "ops.delivery.forecast"
+    _description = "توقع حمل التوصيل حسب اليوم والمنطقة"
+    _order = "delivery_date, city, carrier_id"
+
+    delivery_date = fields.Date(string="تاريخ التوصيل", required=True, index=True, readonly=True)
+    city = fields.Char(string="المدينة", readonly=True)
+    shipping_type = fields.Selection(
+        [
+            ("riyadh", "داخل الرياض"),
+            ("outside", "خارج الرياض"),
+        ],
+        string="المنطقة",
+        readonly=True,
+    )
+    carrier_id = fields.Many2one("ops.shipping.carrier", string="شركة الشحن", readonly=True)
+    company_id = fields.Many2one("res.company", string="الشركة", required=True, readonly=True)
+
+    order_count = fields.Integer(string="عدد الطلبات", aggregator="sum", readonly=True)
+    product_qty = fields.Float(string="الكمية", aggregator="sum", readonly=True)
+    shipping_cost = fields.Float(string="تكلفة الشحن المتوقعة", aggregator="sum", readonly=True)
+
+    def init(self):
+        if not tools.index_exists(self.env.cr, "ops_delivery_forecast_key_uniq"):
+            # الجدول مشتق بالكامل ويعاد بناؤه من data: قد يحتوي أسطراً مكررة من إصدار سابق
+            self.env.cr.execute("DELETE FROM ops_delivery_forecast")
+            tools.create_unique_index(
+                self.env.cr, "ops_delivery_forecast_key_uniq", self._table, _KEY_INDEX
+            )
+
+    # =========================================================
+    # Incremental refresh (per transaction)
+    # =========================================================
+    @api.model
+    def _ops_mark_orders(self, orders, new=False):
+        """
+        يحفظ مساهمة الطلبات المتغيرة قبل التعديل (لتُطرح)، ويؤجل إضافة مساهمتها
+        الجديدة إلى precommit (مرة واحدة لكل معاملة).
+        new: طلبات أنشئت في هذه المعاملة، ليست لها مساهمة سابقة.
+        """
+        ids = [oid for oid in orders.ids if isinstance(oid, int)]
+        if not ids:
+            return
+
+        data = self.env.cr.precommit.data
+        pending = data.get(_OPS_FORECAST_PRECOMMIT_KEY)
+        if pending is None:
+            pending = data[_OPS_FORECAST_PRECOMMIT_KEY] = {"order_ids": set(), "old": []}
+            self.env.cr.precommit.add(self._ops_precommit_refresh)
+
+        new_ids = set(ids) - pending["order_ids"]
+        if not new_ids:
+            return
+        pending["order_ids"].update(new_ids)
+        if not new:
+            # القيم في قاعدة البيانات لم تُحدث بعد: هذه هي المساهمة القديمة
+            pending["old"].extend(self._ops_read_contributions(new_ids))
+
+    @api.model
+    def _ops_read_contributions(self, order_ids):
+        self.env.cr.execute(_CONTRIBUTION_SQL, [tuple(order_ids)])
+        return self.env.cr.fetchall()
+
+    @api.model
+    def _ops_precommit_refresh(self):
+        # الـ flush قبل الـ pop: الطلبات المعدلة أثناءه تُسجل في نفس pending
+        self.env["sale.order"].flush_model()
+        pending = self.env.cr.precommit.data.pop(_OPS_FORECAST_PRECOMMIT_KEY, None)
+        if not pending:
+            return
+
+        deltas = {}
+        for sign, rows in ((-1, pending["old"]), (1, self._ops_read_contributions(pending["order_ids"]))):
+            for date, city, carrier, company, shipping_type, qty, cost in rows:
+                delta = deltas.setdefault(
+                    (date, city, carrier, company),
+                    {"shipping_type": None, "count": 0, "qty": 0.0, "cost": 0.0},
+                )
+                delta["count"] += sign
+                delta["qty"] += sign * qty
+                delta["cost"] += sign * cost
+                if sign > 0:
+                    delta["shipping_type"] = shipping_type
+        self._ops_apply_deltas(deltas)
+
+    @api.model
+    def _ops_apply_deltas(self, deltas):
+        """يضيف الفروقات إلى أسطر التوقع ويحذف الأسطر التي لم يعد لها طلبات."""
+        deltas = {
+            key: delta for key, delta in deltas.items()
+            if delta["count"] or delta["qty"] or delta["cost"]
+        }
+        if not deltas:
+            return
+        cr = self.env.cr
+        # ترتيب ثابت للمفاتيح يقلل الـ deadlock بين المعاملات المتزامنة
+        for key in sorted(deltas):
+            date, city, carrier, company = key
+            cr.execute(_UPSERT_SQL, dict(
+                deltas[key], date=date, city=city, carrier=carrier, company=company, uid=self.env.uid,
+            ))
+        cr.execute(
+            "DELETE FROM ops_delivery_forecast f "
+            "WHERE f.order_count <= 0 "
+            "AND (f.delivery_date, COALESCE(f.city, ''), COALESCE(f.carrier_id, 0), f.company_id) IN %s",
+            [tuple(deltas)],
+        )
+        self.invalidate_model()
+
+    @api.model
+    def _cron_ops_rebuild(self):
+        """
+        إعادة البناء الليلية. تكلفة الرياض الثابتة (sale_ops_pipeline_v3.shipping_cost_riyadh)
+        إعداد لا يتتبعه @api.depends، لذلك يعاد حساب ops_shipping_cost_estimate المخزن
+        لطلبات الرياض المفتوحة قبل إعادة التجميع.
+        """
+        SaleOrder = self.env["sale.order"].sudo()
+        orders = SaleOrder.search([
+            ("state", "=", "sale"),
+            ("ops_is_open", "=", True),
+            ("shipping_type", "=", "riyadh"),
+        ])
+        if orders:
+            self.env.add_to_compute(SaleOrder._fields["ops_shipping_cost_estimate"], orders)
+            SaleOrder.flush_model(["ops_shipping_cost_estimate"])
+        self._ops_rebuild()
+
+    @api.model
+    def _ops_rebuild(self):
+        """
+        إعادة بناء الجدول بالكامل من القيم المخزنة في sale_order (التثبيت/الترقية
+        من data، و_cron_ops_rebuild ليلاً).
+        """
+        self.env["sale.order"].flush_model()
+        # إعادة البناء تغطي أي تحديث جزئي معلق في هذه المعاملة
+        self.env.cr.precommit.data.pop(_OPS_FORECAST_PRECOMMIT_KEY, None)
+        self.env.cr.execute("DELETE FROM ops_delivery_forecast")
+        self.env.cr.execute(_AGGREGATE_SQL, {"uid": self.env.uid})
+        self.invalidate_model()
+        _logger.info("Ops delivery forecast rebuilt")
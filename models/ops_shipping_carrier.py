@@ -34,6 +34,13 @@ class OpsShippingCarrier(models.Model):
         help="منتج خدمة يمثل بند الشحن داخل PO الشحن."
     )
 
+    # تجميع تكاليف الشحن اليومية في PO واحد مفتوح (Draft) لكل شركة شحن
+    po_consolidation = fields.Boolean(
+        string="تجميع PO الشحن يومياً",
+        help="إذا تم تفعيله: تُضاف تكاليف الشحن لجميع الطلبات في نفس اليوم كسطور (سطر لكل طلب) "
+             "على PO شحن واحد مفتوح لهذه الشركة بدلاً من إنشاء PO لكل طلب.",
+    )
+
     # =========================================
     # التكاليف
     # =========================================
@@ -55,6 +62,15 @@ class OpsShippingCarrier(models.Model):
     ship_days_riyadh = fields.Integer(string="مدة الشحن داخل الرياض (أيام)", default=1)
     ship_days_outside = fields.Integer(string="مدة الشحن خارج الرياض (أيام)", default=3)
 
+    # =========================================
+    # السعة اليومية (للتوزيع الآلي)
+    # =========================================
+    daily_capacity = fields.Integer(
+        string="السعة اليومية (عدد الطلبات)",
+        default=0,
+        help="أقصى عدد طلبات يمكن أن تسلمها شركة الشحن في اليوم الواحد عند التوزيع الآلي. 0 = بدون حد.",
+    )
+
     # =========================================
     # حقول مساعدة للواجهة
     # =========================================
@@ -20,3 +20,30 @@ class PurchaseOrder(models.Model):
         string="PO Type",
         index=True,
     )
+
+    # PO الشحن المجمع (يومي لكل شركة شحن)
+    shipping_carrier_id = fields.Many2one(
+        "ops.shipping.carrier",
+        string="Shipping Carrier",
+        index=True,
+        ondelete="set null",
+    )
+
+    ops_consolidation_date = fields.Date(
+        string="Consolidation Day",
+        index=True,
+        copy=False,
+        help="Set on consolidated shipping POs: the day whose shipping costs are grouped on this PO.",
+    )
+
+
+class PurchaseOrderLine(models.Model):
+    _inherit = "purchase.order.line"
+
+    # sale_order_id على السطر محجوز لـ sale_purchase (related على sale_line_id)
+    ops_sale_order_id = fields.Many2one(
+        "sale.order",
+        string="Shipped Sale Order",
+        index=True,
+        ondelete="set null",
+    )
@@ -1,12 +1,23 @@
 # -*- coding: utf-8 -*-
+import heapq
 import logging
-from datetime import timedelta
+from collections import defaultdict
+from datetime import date, timedelta
+
+from psycopg2 import errors as pg_errors
 
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
 
 _logger = logging.getLogger(__name__)
 
+# أخطاء التزامن التي يعيد Odoo تنفيذ الطلب عندها: لا يجب ابتلاعها
+PG_CONCURRENCY_ERRORS = (
+    pg_errors.SerializationFailure,
+    pg_errors.DeadlockDetected,
+    pg_errors.LockNotAvailable,
+)
+
 # =========================================================
 # Riyadh city normalization
 # =========================================================
@@ -15,6 +26,24 @@ RYADH_NAMES = {
     "الرياض", "لرياض"
 }
 
+# =========================================================
+# Live kanban updates (bus.bus)
+# =========================================================
+# قناة لكل شركة: sale_ops_pipeline_<company_id>
+OPS_BUS_CHANNEL = "sale_ops_pipeline"
+OPS_BUS_NOTIFICATION = "sale_ops_pipeline/cards"
+_OPS_BUS_PRECOMMIT_KEY = "sale_ops_pipeline.bus"
+# الحقول المخزنة التي تظهر على بطاقة الكانبان / تحدد عمودها
+_OPS_BUS_FIELDS = frozenset({
+    "ops_stage_id", "state", "ops_is_open",
+    "kanban_delivery_date", "delivery_state", "kanban_city", "kanban_products_summary",
+})
+# الحقول المخزنة التي تحدد مفتاح/قيم ops.delivery.forecast
+_OPS_FORECAST_FIELDS = frozenset({
+    "kanban_delivery_date", "kanban_city", "shipping_type", "shipping_carrier_id", "company_id",
+    "state", "ops_is_open", "ops_product_qty", "ops_shipping_cost_estimate",
+})
+
 
 class SaleOrder(models.Model):
     _inherit = "sale.order"
@@ -32,8 +61,199 @@ class SaleOrder(models.Model):
 
     @api.model
     def _group_expand_ops_stage_id(self, stages, domain, order=None):
+        # كل المراحل تبقى ظاهرة (حتى الفارغة/المطوية) ليمكن السحب إليها؛ هذا استعلام واحد
+        # على جدول ops.stage الصغير، أما عدّ الطلبات لكل عمود فمقيد بـ ops_is_open
         return self.env["ops.stage"].search([], order="sequence asc")
 
+    # بدون default: الطلبات القديمة تبقى NULL ويستخدم الـ cron write_date بدلاً منه
+    ops_stage_date = fields.Datetime(
+        string="تاريخ دخول المرحلة",
+        copy=False,
+        readonly=True,
+    )
+
+    # يُفعل بواسطة الـ cron بعد N يوم في مرحلة منتهية/مطوية
+    ops_pipeline_archived = fields.Boolean(
+        string="مؤرشف من خط العمليات",
+        copy=False,
+    )
+
+    # Pipeline scope: board, counts and searches filter on this (indexed)
+    ops_is_open = fields.Boolean(
+        string="ضمن خط العمليات",
+        compute="_compute_ops_is_open",
+        store=True,
+        index=True,
+    )
+
+    @api.depends("state", "ops_stage_id", "ops_pipeline_archived")
+    def _compute_ops_is_open(self):
+        # عروض الأسعار بدون مرحلة عمليات ليست ضمن خط العمليات
+        for order in self:
+            order.ops_is_open = (
+                order.state != "cancel"
+                and not order.ops_pipeline_archived
+                and (order.state == "sale" or bool(order.ops_stage_id))
+            )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        now = fields.Datetime.now()
+        vals_list = [dict(vals, ops_stage_date=vals.get("ops_stage_date") or now) for vals in vals_list]
+        orders = super().create(vals_list)
+        if self.pool.ready:
+            orders._ops_bus_notify(new=True)
+            self.env["ops.delivery.forecast"]._ops_mark_orders(orders, new=True)
+        return orders
+
+    def write(self, vals):
+        archived = self.browse()
+        if "ops_stage_id" in vals:
+            vals = dict(vals, ops_stage_date=fields.Datetime.now())
+            # نقل الطلب لمرحلة جديدة يعيده لخط العمليات (فقط المؤرشف فعلاً)
+            if "ops_pipeline_archived" not in vals:
+                archived = self.filtered("ops_pipeline_archived")
+        res = super().write(vals)
+        if archived:
+            super(SaleOrder, archived).write({"ops_pipeline_archived": False})
+        return res
+
+    def _write_multi(self, vals_list):
+        # نقطة التقاط التغييرات عند الـ flush: تشمل الحقول المحسوبة المخزنة أيضاً
+        if not self.pool.ready:
+            # تثبيت/ترقية: الحساب الأولي لكل الطلبات لا يحتاج إشعارات
+            return super()._write_multi(vals_list)
+        bus_ids = [order.id for order, vals in zip(self, vals_list) if _OPS_BUS_FIELDS & vals.keys()]
+        forecast_ids = [order.id for order, vals in zip(self, vals_list) if _OPS_FORECAST_FIELDS & vals.keys()]
+        if forecast_ids:
+            # قبل الـ UPDATE: قاعدة البيانات ما زالت تحمل المفاتيح القديمة
+            self.env["ops.delivery.forecast"]._ops_mark_orders(self.browse(forecast_ids))
+        moved_ids = [
+            order.id for order, vals in zip(self, vals_list)
+            if "ops_stage_id" in vals or "ops_is_open" in vals or "state" in vals
+        ]
+        if moved_ids:
+            # العمود السابق للبطاقة يُقرأ قبل الـ UPDATE
+            self.browse(moved_ids)._ops_bus_capture_prev()
+        res = super()._write_multi(vals_list)
+        if bus_ids:
+            self.browse(bus_ids)._ops_bus_notify()
+        return res
+
+    def unlink(self):
+        self._ops_bus_capture_prev()
+        self._ops_bus_notify(removed=True)
+        self.env["ops.delivery.forecast"]._ops_mark_orders(self)
+        return super().unlink()
+
+    # =========================================================
+    # Live kanban updates: coalesced per transaction
+    # =========================================================
+    def _ops_bus_pending(self):
+        data = self.env.cr.precommit.data
+        pending = data.get(_OPS_BUS_PRECOMMIT_KEY)
+        if pending is None:
+            pending = data[_OPS_BUS_PRECOMMIT_KEY] = {"changed": set(), "removed": {}, "prev": {}}
+            self.env.cr.precommit.add(self.env["sale.order"]._ops_bus_send)
+        return pending
+
+    def _ops_bus_notify(self, removed=False, new=False):
+        """
+        يسجل الطلبات المتغيرة في المعاملة الحالية؛ يتم إرسال إشعار واحد لكل شركة
+        عند الـ commit (precommit) بدلاً من إشعار لكل كتابة.
+        new: طلبات أنشئت في هذه المعاملة، لم تكن على اللوحة من قبل.
+        """
+        orders = self.filtered(lambda o: isinstance(o.id, int))
+        if not orders:
+            return
+
+        pending = self._ops_bus_pending()
+        if new:
+            for order_id in orders.ids:
+                pending["prev"].setdefault(order_id, None)
+        if removed:
+            for order in orders.sudo():
+                pending["removed"][order.id] = order.company_id.id
+        else:
+            pending["changed"].update(orders.ids)
+
+    def _ops_bus_capture_prev(self):
+        """
+        يحفظ عمود البطاقة كما تراه الواجهة (قيم قاعدة البيانات عند أول تعديل في
+        المعاملة)، لتعديل عدادات الأعمدة للبطاقات غير المحملة في الواجهة.
+        """
+        pending = self._ops_bus_pending()
+        ids = tuple(oid for oid in self.ids if isinstance(oid, int) and oid not in pending["prev"])
+        if not ids:
+            return
+        self.env.cr.execute(
+            "SELECT id, ops_stage_id, ops_is_open, state FROM sale_order WHERE id IN %s", [ids]
+        )
+        for order_id, stage_id, is_open, state in self.env.cr.fetchall():
+            pending["prev"][order_id] = {
+                "ops_stage_id": stage_id or False,
+                "ops_is_open": bool(is_open),
+                "state": state,
+            }
+
+    @api.model
+    def _ops_bus_send(self):
+        pending = self.env.cr.precommit.data.pop(_OPS_BUS_PRECOMMIT_KEY, None)
+        if not pending:
+            return
+
+        payloads = defaultdict(lambda: {"records": [], "removed": []})
+        changed_ids = pending["changed"] - set(pending["removed"])
+        prev = pending["prev"]
+        for order in self.sudo().browse(changed_ids).exists():
+            values = {
+                "ops_stage_id": order.ops_stage_id.id or False,
+                "ops_is_open": order.ops_is_open,
+                "state": order.state,
+            }
+            payloads[order.company_id.id]["records"].append(
+                dict(values, id=order.id, prev=prev.get(order.id, values))
+            )
+        for order_id, company_id in pending["removed"].items():
+            payloads[company_id]["removed"].append({"id": order_id, "prev": prev.get(order_id)})
+
+        Bus = self.env["bus.bus"].sudo()
+        for company_id, payload in payloads.items():
+            Bus._sendone("%s_%s" % (OPS_BUS_CHANNEL, company_id), OPS_BUS_NOTIFICATION, payload)
+
+    @api.model
+    def _ops_get_archive_after_days(self):
+        return int(
+            self.env["ir.config_parameter"].sudo().get_param(
+                "sale_ops_pipeline_v3.archive_after_days", 7
+            ) or 0
+        )
+
+    @api.model
+    def _cron_ops_archive_finished_orders(self):
+        """
+        يخرج من خط العمليات الطلبات الموجودة منذ أكثر من N يوم في مرحلة
+        منتهية (is_done) أو مطوية (fold).
+        N من ir.config_parameter: sale_ops_pipeline_v3.archive_after_days (افتراضي 7).
+        الطلبات المؤكدة بدون مرحلة عمل قائم ولا تؤرشف؛ عروض الأسعار والملغاة
+        بدون مرحلة خارج الخط أصلاً (_compute_ops_is_open).
+        """
+        stages = self.env["ops.stage"].search(["|", ("is_done", "=", True), ("fold", "=", True)])
+        if not stages:
+            return
+
+        cutoff = fields.Datetime.now() - timedelta(days=self._ops_get_archive_after_days())
+        orders = self.sudo().search([
+            ("ops_is_open", "=", True),
+            ("ops_stage_id", "in", stages.ids),
+            "|",
+            ("ops_stage_date", "<", cutoff),
+            "&", ("ops_stage_date", "=", False), ("write_date", "<", cutoff),
+        ])
+        if orders:
+            orders.write({"ops_pipeline_archived": True})
+            _logger.info("Ops pipeline: archived %s finished orders", len(orders))
+
     # =========================================================
     # Kanban Helper Fields (Stored)
     # =========================================================
@@ -53,6 +273,7 @@ class SaleOrder(models.Model):
         string="تاريخ التوصيل المتوقع",
         compute="_compute_kanban_delivery_date",
         store=True,
+        index=True,
     )
 
     delivery_state = fields.Selection(
@@ -115,6 +336,21 @@ class SaleOrder(models.Model):
         help="منتج خدمة يُستخدم كسطر واحد في PO الشحن لكل طلب.",
     )
 
+    # =========================================================
+    # Delivery Forecast Measures (Stored, aggregated in ops.delivery.forecast)
+    # =========================================================
+    ops_product_qty = fields.Float(
+        string="إجمالي الكمية",
+        compute="_compute_ops_forecast_measures",
+        store=True,
+    )
+
+    ops_shipping_cost_estimate = fields.Float(
+        string="تكلفة الشحن المتوقعة",
+        compute="_compute_ops_forecast_measures",
+        store=True,
+    )
+
     # =========================================================
     # PO Counters (for stat buttons)
     # =========================================================
@@ -148,6 +384,30 @@ class SaleOrder(models.Model):
                 lines.append(f"{line.product_id.display_name} × {qty:g}")
             order.kanban_products_summary = "\n".join(lines) if lines else False
 
+    @api.depends(
+        "order_line.product_id",
+        "order_line.product_uom_qty",
+        "order_line.display_type",
+        "order_line.product_id.shipping_cost_outside_riyadh",
+        "shipping_type",
+        "shipping_execution",
+        "shipping_carrier_id",
+        "shipping_carrier_id.is_internal",
+        "shipping_carrier_id.cost_riyadh_flat",
+    )
+    def _compute_ops_forecast_measures(self):
+        """نفس قواعد PO الشحن: 0 إذا سائق الشركة أو شركة شحن داخلية."""
+        for order in self:
+            order.ops_product_qty = sum(
+                line.product_uom_qty or 0.0
+                for line in order.order_line
+                if not line.display_type and line.product_id
+            )
+            if order.shipping_execution != "carrier" or order.shipping_carrier_id.is_internal:
+                order.ops_shipping_cost_estimate = 0.0
+            else:
+                order.ops_shipping_cost_estimate = order._ops_compute_shipping_cost()
+
     @api.depends("partner_shipping_id.city")
     def _compute_kanban_city(self):
         for order in self:
@@ -165,19 +425,24 @@ class SaleOrder(models.Model):
     # =========================================================
     # Helpers: Manufacturing days from config (CORRECT MODEL/FIELD)
     # =========================================================
-    def _ops_get_mfg_days_from_config(self):
+    def _ops_get_mfg_days_from_config(self, mfg_map=None):
         """
         يجلب مدة التصنيع من شاشة:
           ops.manufacturing.setting
         والحقل:
           manufacturing_days
         المنطق: نأخذ أقصى مدة بين فئات المنتجات الموجودة في الطلب.
+
+        mfg_map: ناتج _ops_get_mfg_days_map() لتفادي استعلام لكل طلب عند الحساب الجماعي.
         """
         self.ensure_one()
         cats = self._ops_get_order_categories()
         if not cats:
             return 0
 
+        if mfg_map is not None:
+            return max((mfg_map.get(c, 0) for c in cats.ids), default=0)
+
         # ✅ الموديل الصحيح داخل الموديول
         if "ops.manufacturing.setting" not in self.env:
             return 0
@@ -220,6 +485,16 @@ class SaleOrder(models.Model):
         # fallback
         return 3 if self.shipping_type == "riyadh" else 3
 
+    # =========================================================
+    # Helpers: Base date (date_order in user timezone)
+    # =========================================================
+    def _ops_get_base_date(self):
+        self.ensure_one()
+        # تاريخ الطلب مع مراعاة timezone للمستخدم
+        if self.date_order:
+            return fields.Datetime.context_timestamp(self, self.date_order).date()
+        return fields.Date.context_today(self)
+
     # =========================================================
     # Expected Delivery Date (Manufacturing + Shipping)
     # =========================================================
@@ -241,16 +516,13 @@ class SaleOrder(models.Model):
         ✅ التصنيع: من ops.manufacturing.setting حسب فئة المنتج
         ✅ الشحن: من شركة الشحن أو 0 إذا سائق الشركة
         """
+        # استعلام واحد لإعدادات التصنيع لكل دفعة بدلاً من استعلام لكل طلب
+        mfg_map = self._ops_get_mfg_days_map() if self else {}
         for order in self:
-            # تاريخ الطلب مع مراعاة timezone للمستخدم
-            if order.date_order:
-                base_dt = fields.Datetime.context_timestamp(order, order.date_order)
-                base_date = base_dt.date()
-            else:
-                base_date = fields.Date.context_today(order)
+            base_date = order._ops_get_base_date()
 
             try:
-                mfg_days = int(order._ops_get_mfg_days_from_config() or 0)
+                mfg_days = int(order._ops_get_mfg_days_from_config(mfg_map) or 0)
             except Exception:
                 _logger.exception("Failed to compute manufacturing days for SO %s", order.name)
                 mfg_days = 0
@@ -307,7 +579,13 @@ class SaleOrder(models.Model):
 
         if has_sale_order_id and has_po_type:
             mfg_domain = [("sale_order_id", "=", self.id), ("po_type", "=", "manufacturing")]
-            ship_domain = [("sale_order_id", "=", self.id), ("po_type", "=", "shipping")]
+            # PO الشحن المجمع مرتبط بالطلب عبر السطر وليس رأس الـ PO
+            ship_domain = [
+                ("po_type", "=", "shipping"),
+                "|",
+                ("sale_order_id", "=", self.id),
+                ("order_line.ops_sale_order_id", "=", self.id),
+            ]
         elif has_sale_order_id and not has_po_type:
             mfg_domain = [("sale_order_id", "=", self.id)]
             ship_domain = [("sale_order_id", "=", self.id)]
@@ -404,6 +682,78 @@ class SaleOrder(models.Model):
 
         return self.shipping_vendor_id, self.shipping_service_product_id
 
+    def _ops_compute_shipping_cost(self, carrier=None):
+        """
+        تكلفة الشحن الإجمالية للطلب (سطر واحد):
+        - داخل الرياض: المبلغ الثابت من شركة الشحن أو من الإعدادات
+        - خارج الرياض: مجموع (تكلفة الوحدة من كرت المنتج × الكمية)
+
+        carrier: شركة شحن بديلة للحساب (افتراضياً shipping_carrier_id).
+        """
+        self.ensure_one()
+        if carrier is None:
+            carrier = self.shipping_carrier_id
+
+        if self.shipping_type == "riyadh":
+            if carrier and carrier.cost_riyadh_flat:
+                return float(carrier.cost_riyadh_flat or 0.0)
+            return self._ops_get_flat_shipping_cost_riyadh()
+
+        total_cost = 0.0
+        for line in self.order_line:
+            if line.display_type or not line.product_id:
+                continue
+            per_unit = self._ops_get_product_shipping_cost_outside(line.product_id)
+            if per_unit <= 0:
+                continue
+            total_cost += per_unit * (line.product_uom_qty or 0.0)
+        return total_cost
+
+    def _ops_get_consolidated_shipping_po(self, carrier, vendor):
+        """
+        يرجع PO الشحن المجمع (Draft) لشركة الشحن في اليوم الحالي، أو ينشئه إذا لم يوجد.
+
+        - UPDATE على سجل شركة الشحن قبل البحث: المعاملات تعمل بـ REPEATABLE READ، فالمعاملة
+          المنتظرة تحصل على serialization failure بعد commit الأولى ويعيد Odoo تنفيذها
+          بلقطة جديدة ترى الـ PO (القفل الاستشاري وحده لا يكفي لأن اللقطة أقدم منه)
+        - SELECT ... FOR UPDATE على الـ PO الموجود حتى لا يتم تأكيده/إلغاؤه أثناء إضافة السطر
+        """
+        self.ensure_one()
+        PurchaseOrder = self.env["purchase.order"].sudo()
+        company = self.company_id
+        today = fields.Date.context_today(self)
+
+        self.env.cr.execute(
+            "UPDATE ops_shipping_carrier SET write_date = (now() at time zone 'UTC') WHERE id = %s",
+            [carrier.id],
+        )
+
+        domain = [
+            ("po_type", "=", "shipping"),
+            ("shipping_carrier_id", "=", carrier.id),
+            ("partner_id", "=", vendor.id),
+            ("company_id", "=", company.id),
+            ("ops_consolidation_date", "=", today),
+            ("state", "=", "draft"),
+        ]
+        po = PurchaseOrder.search(domain, order="id desc", limit=1)
+        if po:
+            self.env.cr.execute(
+                "SELECT id FROM purchase_order WHERE id = %s AND state = 'draft' FOR UPDATE",
+                [po.id],
+            )
+            if self.env.cr.fetchone():
+                return po
+
+        return PurchaseOrder.create({
+            "partner_id": vendor.id,
+            "origin": "%s / %s" % (carrier.name, today),
+            "company_id": company.id,
+            "po_type": "shipping",
+            "shipping_carrier_id": carrier.id,
+            "ops_consolidation_date": today,
+        })
+
     def action_create_shipping_po(self):
         """
         Create ONE Shipping PO per Sale Order based on rules:
@@ -412,6 +762,8 @@ class SaleOrder(models.Model):
         - If shipping_execution = carrier:
             - Inside Riyadh: 1 PO line qty=1 price = flat shipping (from carrier or config)
             - Outside Riyadh: 1 PO line qty=1 price = sum(qty * product shipping cost)
+        - If the carrier has po_consolidation: the line is added to the carrier's
+          open draft PO of the day instead of a new PO per order.
         """
         PurchaseOrder = self.env["purchase.order"].sudo()
         POL = self.env["purchase.order.line"].sudo()
@@ -436,8 +788,10 @@ class SaleOrder(models.Model):
             # Prevent duplicates
             if has_sale_order_id and has_po_type:
                 existing = PurchaseOrder.search_count([
-                    ("sale_order_id", "=", order.id),
                     ("po_type", "=", "shipping"),
+                    "|",
+                    ("sale_order_id", "=", order.id),
+                    ("order_line.ops_sale_order_id", "=", order.id),
                 ])
             elif has_sale_order_id:
                 existing = PurchaseOrder.search_count([("sale_order_id", "=", order.id)])
@@ -451,39 +805,30 @@ class SaleOrder(models.Model):
                 continue
 
             # Compute total shipping cost (ONE LINE)
-            total_cost = 0.0
-
-            if order.shipping_type == "riyadh":
-                if order.shipping_carrier_id and order.shipping_carrier_id.cost_riyadh_flat:
-                    total_cost = float(order.shipping_carrier_id.cost_riyadh_flat or 0.0)
-                else:
-                    total_cost = order._ops_get_flat_shipping_cost_riyadh()
-            else:
-                for line in order.order_line:
-                    if line.display_type or not line.product_id:
-                        continue
-                    per_unit = order._ops_get_product_shipping_cost_outside(line.product_id)
-                    if per_unit <= 0:
-                        continue
-                    total_cost += per_unit * (line.product_uom_qty or 0.0)
+            total_cost = order._ops_compute_shipping_cost()
 
             if total_cost <= 0:
                 continue
 
-            po_vals = {
-                "partner_id": vendor.id,
-                "origin": order.name,
-                "company_id": order.company_id.id,
-            }
-            if has_sale_order_id:
-                po_vals["sale_order_id"] = order.id
-            if has_po_type:
-                po_vals["po_type"] = "shipping"
-
-            po = PurchaseOrder.create(po_vals)
+            carrier = order.shipping_carrier_id
+            if carrier and carrier.po_consolidation:
+                po = order._ops_get_consolidated_shipping_po(carrier, vendor)
+            else:
+                po_vals = {
+                    "partner_id": vendor.id,
+                    "origin": order.name,
+                    "company_id": order.company_id.id,
+                }
+                if has_sale_order_id:
+                    po_vals["sale_order_id"] = order.id
+                if has_po_type:
+                    po_vals["po_type"] = "shipping"
+
+                po = PurchaseOrder.create(po_vals)
 
             POL.create({
                 "order_id": po.id,
+                "ops_sale_order_id": order.id,
                 "product_id": service_product.id,
                 "name": _("تكلفة شحن للطلب %s (%s)") % (
                     order.name,
@@ -495,11 +840,169 @@ class SaleOrder(models.Model):
                 "date_planned": fields.Datetime.now(),
             })
 
+    # =========================================================
+    # Batch Carrier Auto-Assignment
+    # =========================================================
+    @api.model
+    def _ops_get_mfg_days_map(self):
+        """{product.category id: manufacturing_days} من ops.manufacturing.setting (استعلام واحد)."""
+        rows = self.env["ops.manufacturing.setting"].sudo().search_read(
+            [("active", "=", True)], ["product_category_id", "manufacturing_days"]
+        )
+        return {
+            r["product_category_id"][0]: int(r["manufacturing_days"] or 0)
+            for r in rows if r["product_category_id"]
+        }
+
+    def _ops_carrier_candidates(self):
+        """
+        الطلبات المؤهلة للتوزيع الآلي: مؤكدة، تنفيذها شركة شحن، وبدون شركة شحن محددة
+        (الاختيار اليدوي لا يتم تغييره).
+        """
+        return self.filtered(
+            lambda o: o.state == "sale"
+            and o.shipping_execution == "carrier"
+            and not o.shipping_carrier_id
+        )
+
+    def _ops_plan_carrier_assignment(self, carriers):
+        """
+        توزيع greedy باستخدام heap:
+        - لكل طلب: خيارات (التأخير عن الموعد الموعود, التكلفة, مدة الشحن, الترتيب) لكل شركة شحن
+        - الطلبات ذات الموعد الأقرب والخيارات الأقل تُعالج أولاً
+        - كل طلب يأخذ أرخص خيار متاح ضمن السعة اليومية لشركة الشحن في يوم التسليم
+
+        يرجع {carrier_id: [sale.order ids]}.
+        """
+        if not self or not carriers:
+            return {}
+
+        mfg_map = self._ops_get_mfg_days_map()
+
+        carrier_rows = [
+            (
+                idx,
+                carrier,
+                int(carrier.ship_days_riyadh or 0),
+                int(carrier.ship_days_outside or 0),
+            )
+            for idx, carrier in enumerate(carriers)
+        ]
+        capacity = {carrier.id: int(carrier.daily_capacity or 0) for carrier in carriers}
+
+        order_options = {}
+        order_heap = []
+        min_date = None
+
+        for order in self:
+            base_date = order._ops_get_base_date()
+            mfg_days = order._ops_get_mfg_days_from_config(mfg_map)
+            dispatch = base_date + timedelta(days=mfg_days)
+
+            deadline = None
+            if order.commitment_date:
+                deadline = fields.Datetime.context_timestamp(order, order.commitment_date).date()
+
+            is_riyadh = order.shipping_type == "riyadh"
+
+            options = []
+            on_time = 0
+            for idx, carrier, days_riyadh, days_outside in carrier_rows:
+                days = days_riyadh if is_riyadh else days_outside
+                # نفس قواعد تكلفة PO الشحن
+                cost = order._ops_compute_shipping_cost(carrier)
+                delivery = dispatch + timedelta(days=days)
+                lateness = max((delivery - deadline).days, 0) if deadline else 0
+                if not lateness:
+                    on_time += 1
+                options.append((lateness, cost, days, idx, carrier.id, delivery))
+            heapq.heapify(options)
+            order_options[order.id] = options
+
+            if min_date is None or dispatch < min_date:
+                min_date = dispatch
+            heapq.heappush(order_heap, ((deadline or date.max), on_time, order.id))
+
+        # الحمل الحالي: طلبات مؤكدة مسندة مسبقاً لنفس الشركات (خارج هذه الدفعة)
+        load = defaultdict(int)
+        if any(capacity.values()):
+            groups = self.sudo()._read_group(
+                [
+                    ("state", "=", "sale"),
+                    ("shipping_carrier_id", "in", carriers.ids),
+                    ("kanban_delivery_date", ">=", min_date),
+                    ("id", "not in", self.ids),
+                ],
+                ["shipping_carrier_id", "kanban_delivery_date:day"],
+                ["__count"],
+            )
+            for carrier, day, count in groups:
+                load[(carrier.id, day)] = count
+
+        assignments = defaultdict(list)
+        while order_heap:
+            _deadline, _on_time, order_id = heapq.heappop(order_heap)
+            options = order_options[order_id]
+            while options:
+                _lateness, _cost, _days, _idx, carrier_id, delivery = heapq.heappop(options)
+                cap = capacity[carrier_id]
+                key = (carrier_id, delivery)
+                if cap and load[key] >= cap:
+                    continue
+                load[key] += 1
+                assignments[carrier_id].append(order_id)
+                break
+
+        return assignments
+
+    def action_ops_auto_assign_carrier(self):
+        """
+        يسند شركة شحن لكل طلب مؤكد بدون شركة شحن بأقل تكلفة مع احترام
+        موعد التسليم الموعود (commitment_date) والسعة اليومية لكل شركة.
+        الكتابة تتم دفعة واحدة لكل شركة شحن.
+        """
+        orders = self._ops_carrier_candidates()
+        # شركات بدون مورد أو منتج خدمة ستفشل عند إنشاء PO الشحن
+        carriers = self.env["ops.shipping.carrier"].search([
+            ("is_internal", "=", False),
+            ("vendor_id", "!=", False),
+            ("service_product_id", "!=", False),
+        ])
+
+        assignments = orders._ops_plan_carrier_assignment(carriers)
+
+        assigned = 0
+        for carrier_id, order_ids in assignments.items():
+            self.browse(order_ids).write({"shipping_carrier_id": carrier_id})
+            assigned += len(order_ids)
+
+        _logger.info(
+            "Carrier auto-assignment: %s/%s orders assigned", assigned, len(orders)
+        )
+
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "title": _("توزيع شركات الشحن"),
+                "message": _("تم إسناد %(assigned)s من %(total)s طلب.") % {
+                    "assigned": assigned,
+                    "total": len(orders),
+                },
+                "type": "success" if assigned == len(orders) else "warning",
+                "sticky": False,
+            },
+        }
+
     def action_confirm(self):
         res = super(SaleOrder, self).action_confirm()
         for order in self:
             try:
-                order.action_create_shipping_po()
+                with self.env.cr.savepoint():
+                    order.action_create_shipping_po()
+            except PG_CONCURRENCY_ERRORS:
+                # يُعاد تنفيذ الطلب بالكامل بواسطة Odoo (retrying)
+                raise
             except Exception:
                 _logger.exception("Failed to create Shipping PO for SO %s", order.name)
         return res
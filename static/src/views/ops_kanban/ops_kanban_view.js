@@ -0,0 +1,231 @@
+/** @odoo-module **/
+
+import { onWillUnmount } from "@odoo/owl";
+import { Domain } from "@web/core/domain";
+import { user } from "@web/core/user";
+import { registry } from "@web/core/registry";
+import { useService } from "@web/core/utils/hooks";
+import { getFieldsSpec } from "@web/model/relational/utils";
+import { kanbanView } from "@web/views/kanban/kanban_view";
+import { KanbanController } from "@web/views/kanban/kanban_controller";
+
+// Must match OPS_BUS_CHANNEL / OPS_BUS_NOTIFICATION in models/sale_order.py
+const OPS_BUS_CHANNEL = "sale_ops_pipeline";
+const OPS_BUS_NOTIFICATION = "sale_ops_pipeline/cards";
+const OPS_BUS_DELAY = 300;
+
+/**
+ * Operations pipeline kanban: listens to sale.order ops changes on the bus and
+ * patches only the affected cards and column counters (no board/column reload).
+ */
+export class OpsLiveKanbanController extends KanbanController {
+    setup() {
+        super.setup();
+        this.busService = useService("bus_service");
+        this.orm = useService("orm");
+        this.opsChannels = (user.context.allowed_company_ids || [user.activeCompany.id]).map(
+            (companyId) => `${OPS_BUS_CHANNEL}_${companyId}`
+        );
+        this.opsPending = { records: new Map(), removed: new Map() };
+        this.opsTimeout = null;
+
+        this.onOpsCardsUpdate = this.onOpsCardsUpdate.bind(this);
+        for (const channel of this.opsChannels) {
+            this.busService.addChannel(channel);
+        }
+        this.busService.subscribe(OPS_BUS_NOTIFICATION, this.onOpsCardsUpdate);
+
+        onWillUnmount(() => {
+            clearTimeout(this.opsTimeout);
+            this.busService.unsubscribe(OPS_BUS_NOTIFICATION, this.onOpsCardsUpdate);
+            for (const channel of this.opsChannels) {
+                this.busService.deleteChannel(channel);
+            }
+        });
+    }
+
+    /**
+     * Notifications are already coalesced per transaction server side; bursts
+     * of transactions (e.g. mass confirm) are merged here before patching.
+     * `prev` is where the card was when the board last saw it: the oldest one is kept.
+     */
+    onOpsCardsUpdate({ records = [], removed = [] }) {
+        const pending = this.opsPending;
+        for (const data of records) {
+            const previous = pending.records.get(data.id);
+            pending.records.set(data.id, previous ? { ...data, prev: previous.prev } : data);
+        }
+        for (const { id, prev } of removed) {
+            const previous = pending.records.get(id);
+            pending.records.delete(id);
+            pending.removed.set(id, previous ? previous.prev : prev);
+        }
+        clearTimeout(this.opsTimeout);
+        this.opsTimeout = setTimeout(() => this.opsApplyPending(), OPS_BUS_DELAY);
+    }
+
+    /**
+     * Containers holding cards: the groups, or the root list when ungrouped.
+     * Both expose _addRecord / _removeRecords, which keep the counters in sync.
+     */
+    opsContainers() {
+        const root = this.model.root;
+        return root.isGrouped ? root.groups : [root];
+    }
+
+    opsRecords(container) {
+        return container.list ? container.list.records : container.records;
+    }
+
+    opsFindCard(resId) {
+        for (const container of this.opsContainers()) {
+            const records = this.opsRecords(container);
+            const index = records.findIndex((record) => record.resId === resId);
+            if (index !== -1) {
+                return { container, record: records[index], index };
+            }
+        }
+        return null;
+    }
+
+    opsIsGroupedByStage() {
+        const root = this.model.root;
+        return root.isGrouped && root.groupByField.name === "ops_stage_id";
+    }
+
+    /**
+     * Column for a stage id, the root list when ungrouped, null for other
+     * groupings (only cards already on the board are patched there).
+     */
+    opsContainerForStage(stageId) {
+        const root = this.model.root;
+        if (!root.isGrouped) {
+            return root;
+        }
+        if (!this.opsIsGroupedByStage()) {
+            return null;
+        }
+        return root.groups.find((group) => group.value === stageId) || null;
+    }
+
+    /**
+     * Column that counts a card which is not loaded on the board (beyond the
+     * column's limit or in a folded column), from its previous values.
+     */
+    opsUnloadedSource(prev) {
+        if (!prev || !prev.ops_is_open || prev.state === "cancel") {
+            return null;
+        }
+        const container = this.opsContainerForStage(prev.ops_stage_id);
+        if (!container || container.count <= this.opsRecords(container).length) {
+            // Every counted card is loaded: this one was not counted here
+            return null;
+        }
+        return container;
+    }
+
+    /**
+     * Only fully loaded, unfolded columns get a datapoint; otherwise the card
+     * would appear out of order, so only the counter is bumped.
+     */
+    opsInsert(container, row, index = 0) {
+        const records = this.opsRecords(container);
+        if (container.isFolded || records.length < container.count) {
+            container.count++;
+            return;
+        }
+        const list = container.list || container;
+        container._addRecord(list._createRecordDatapoint(row), index);
+    }
+
+    async opsApplyPending() {
+        const { records, removed } = this.opsPending;
+        this.opsPending = { records: new Map(), removed: new Map() };
+
+        for (const [resId, prev] of removed) {
+            const card = this.opsFindCard(resId);
+            if (card) {
+                card.container._removeRecords([card.record.id]);
+            } else {
+                const source = this.opsUnloadedSource(prev);
+                if (source) {
+                    source.count--;
+                }
+            }
+        }
+
+        // Cards not on the board that cannot be visible need no RPC at all
+        // (draft quotations outside the pipeline, cancelled orders, ...)
+        const changed = [];
+        for (const data of records.values()) {
+            if (this.opsFindCard(data.id) || (data.ops_is_open && data.state !== "cancel")) {
+                changed.push(data);
+            } else {
+                const source = this.opsUnloadedSource(data.prev);
+                if (source) {
+                    source.count--;
+                }
+            }
+        }
+        if (!changed.length) {
+            return;
+        }
+
+        // One read for all changed cards, restricted to the board's current domain:
+        // ids missing from the result no longer match the filters and are removed.
+        const config = this.model.config;
+        const { records: rows } = await this.orm.webSearchRead(
+            config.resModel,
+            Domain.and([config.domain, [["id", "in", changed.map((data) => data.id)]]]).toList(),
+            {
+                specification: getFieldsSpec(config.activeFields, config.fields, config.context),
+                context: config.context,
+            }
+        );
+        const rowsById = new Map(rows.map((row) => [row.id, row]));
+
+        for (const data of changed) {
+            const row = rowsById.get(data.id);
+            const target = row
+                ? this.opsContainerForStage(row.ops_stage_id ? row.ops_stage_id.id : false)
+                : null;
+            const card = this.opsFindCard(data.id);
+
+            if (card) {
+                card.container._removeRecords([card.record.id]);
+                // Other groupings: the card stays in its column
+                const container = row && (target || (this.opsIsGroupedByStage() ? null : card.container));
+                if (container === card.container) {
+                    // In-place update: keep the card and its position
+                    const list = container.list || container;
+                    container._addRecord(list._createRecordDatapoint(row), card.index);
+                } else if (container) {
+                    this.opsInsert(container, row);
+                }
+                continue;
+            }
+
+            // Unloaded card: its previous column may already count it. A state
+            // change (e.g. quotation confirmed) may have changed whether the board's
+            // filters matched it, so it is then treated as entering the board.
+            const prev = data.prev && data.prev.state === data.state ? data.prev : null;
+            const source = row ? this.opsUnloadedSource(prev) : this.opsUnloadedSource(data.prev);
+            if (source && source === target) {
+                continue;
+            }
+            if (source) {
+                source.count--;
+            }
+            if (target) {
+                this.opsInsert(target, row);
+            }
+        }
+    }
+}
+
+export const opsLiveKanbanView = {
+    ...kanbanView,
+    Controller: OpsLiveKanbanController,
+};
+
+registry.category("views").add("ops_live_kanban", opsLiveKanbanView);
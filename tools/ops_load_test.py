@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Load test for the Sales Operations pipeline over JSON-RPC.
+
+Runs against a local Odoo + PostgreSQL with sale_ops_pipeline installed.
+Standard library only (not imported by the addon).
+
+Simulates:
+  - planners keeping the ``action_sale_orders_ops`` kanban open
+    (web_read_group per stage + web_search_read per column, periodic refresh)
+    and dragging cards between stages
+  - sales users confirming orders in bursts (create + action_confirm)
+
+Reports p50 / p95 / p99 latency and throughput per operation.
+
+Usage:
+    python tools/ops_load_test.py --db ops_load --seed 5000
+    python tools/ops_load_test.py --db ops_load --planners 50 --sellers 5 --duration 120
+"""
+import argparse
+import http.cookiejar
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+# Same default filters as the pipeline action (action_sale_orders_ops):
+# search_default_ops_open + search_default_sales
+PIPELINE_DOMAIN = [("ops_is_open", "=", True), ("state", "=", "sale")]
+
+KANBAN_SPEC = {
+    "name": {},
+    "partner_id": {"fields": {"display_name": {}}},
+    "amount_total": {},
+    "currency_id": {"fields": {}},
+    "date_order": {},
+    "kanban_delivery_date": {},
+    "client_order_ref": {},
+    "kanban_city": {},
+    "kanban_products_summary": {},
+    "activity_state": {},
+    "ops_stage_id": {"fields": {"display_name": {}}},
+}
+
+CITIES = ["الرياض", "Riyadh", "جدة", "الدمام", "مكة", "المدينة", "الخبر", "أبها", "تبوك"]
+
+
+# =========================================================
+# JSON-RPC client
+# =========================================================
+class RpcError(Exception):
+    pass
+
+
+class OdooClient:
+    """One authenticated web session (cookie based), like a browser tab."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, url, db, login, password, timeout=60):
+        self.url = url.rstrip("/")
+        self.db = db
+        self.login = login
+        self.password = password
+        self.timeout = timeout
+        self.context = {}
+        self._opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def _post(self, path, params):
+        payload = json.dumps({
+            "jsonrpc": "2.0",
+            "method": "call",
+            "id": next(self._ids),
+            "params": params,
+        }).encode()
+        req = urllib.request.Request(
+            self.url + path, data=payload, headers={"Content-Type": "application/json"}
+        )
+        with self._opener.open(req, timeout=self.timeout) as resp:
+            body = json.loads(resp.read())
+        if body.get("error"):
+            err = body["error"]
+            raise RpcError(err.get("data", {}).get("message") or err.get("message"))
+        return body.get("result")
+
+    def authenticate(self):
+        res = self._post("/web/session/authenticate", {
+            "db": self.db, "login": self.login, "password": self.password,
+        })
+        if not res or not res.get("uid"):
+            raise RpcError("Authentication failed for %s" % self.login)
+        self.context = res.get("user_context") or {}
+        return res["uid"]
+
+    def call(self, model, method, *args, **kwargs):
+        kwargs.setdefault("context", self.context)
+        return self._post("/web/dataset/call_kw/%s/%s" % (model, method), {
+            "model": model, "method": method, "args": list(args), "kwargs": kwargs,
+        })
+
+
+# =========================================================
+# Stats
+# =========================================================
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def measure(self, op, func, *args, **kwargs):
+        """Only successful calls feed the latency samples; failures are counted apart."""
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self.errors[op] += 1
+            return None
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies[op].append(elapsed)
+        return result
+
+    @staticmethod
+    def percentile(values, pct):
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        rank = max(int(round(pct / 100.0 * len(ordered))) - 1, 0)
+        return ordered[min(rank, len(ordered) - 1)]
+
+    def report(self, duration, out=sys.stdout):
+        header = "%-18s %8s %7s %9s %9s %9s %9s" % (
+            "operation", "ok", "errors", "p50 ms", "p95 ms", "p99 ms", "ok/s")
+        out.write(header + "\n" + "-" * len(header) + "\n")
+        for op in sorted(set(self.latencies) | set(self.errors)):
+            values = self.latencies.get(op, [])
+            out.write("%-18s %8d %7d %9.1f %9.1f %9.1f %9.2f\n" % (
+                op,
+                len(values),
+                self.errors.get(op, 0),
+                self.percentile(values, 50) * 1000,
+                self.percentile(values, 95) * 1000,
+                self.percentile(values, 99) * 1000,
+                len(values) / duration if duration else 0.0,
+            ))
+
+
+# =========================================================
+# Dataset
+# =========================================================
+def seed(client, n_orders, n_partners=500, n_products=200, n_carriers=4, batch=200, confirm_ratio=0.7):
+    """
+    Creates a dataset that exercises the confirm path: carriers with vendor and
+    service product (half of them consolidating shipping POs), manufacturing
+    settings per category, products with outside-Riyadh shipping costs, and
+    orders with a carrier and a promised date spread across the ops stages.
+    """
+    rnd = random.Random(42)
+    stage_ids = client.call("ops.stage", "search", [])
+
+    partner_ids = client.call("res.partner", "create", [
+        {"name": "Load Customer %d" % i, "city": rnd.choice(CITIES)}
+        for i in range(n_partners)
+    ])
+
+    category_ids = client.call("product.category", "create", [
+        {"name": "Load Category %d" % i} for i in range(10)
+    ])
+    client.call("ops.manufacturing.setting", "create", [
+        {"product_category_id": categ_id, "manufacturing_days": rnd.randint(0, 10)}
+        for categ_id in category_ids
+    ])
+    product_ids = client.call("product.product", "create", [
+        {
+            "name": "Load Product %d" % i,
+            "type": "consu",
+            "categ_id": rnd.choice(category_ids),
+            "list_price": rnd.randint(50, 5000),
+            "shipping_cost_outside_riyadh": rnd.randint(10, 80),
+        }
+        for i in range(n_products)
+    ])
+
+    vendor_ids = client.call("res.partner", "create", [
+        {"name": "Load Carrier Vendor %d" % i, "supplier_rank": 1} for i in range(n_carriers)
+    ])
+    service_id = client.call("product.product", "create", [
+        {"name": "Load Shipping Service", "type": "service", "sale_ok": False, "purchase_ok": True}
+    ])[0]
+    carrier_ids = client.call("ops.shipping.carrier", "create", [
+        {
+            "name": "Load Carrier %d" % i,
+            "vendor_id": vendor_ids[i],
+            "service_product_id": service_id,
+            "cost_riyadh_flat": rnd.randint(15, 40),
+            "ship_days_riyadh": rnd.randint(1, 2),
+            "ship_days_outside": rnd.randint(2, 5),
+            "daily_capacity": rnd.choice([0, 200, 500]),
+            "po_consolidation": i % 2 == 0,
+        }
+        for i in range(n_carriers)
+    ])
+
+    dataset = {"partner_ids": partner_ids, "product_ids": product_ids, "carrier_ids": carrier_ids}
+
+    created = 0
+    while created < n_orders:
+        size = min(batch, n_orders - created)
+        vals = []
+        for _i in range(size):
+            order = order_vals(rnd, dataset)
+            order["ops_stage_id"] = rnd.choice(stage_ids) if stage_ids else False
+            vals.append(order)
+        order_ids = client.call("sale.order", "create", vals)
+        to_confirm = [oid for oid in order_ids if rnd.random() < confirm_ratio]
+        if to_confirm:
+            client.call("sale.order", "action_confirm", to_confirm)
+        created += size
+        print("seeded %d/%d orders" % (created, n_orders), flush=True)
+
+    return dataset
+
+
+def load_dataset(client):
+    """Reuses an already seeded database."""
+    return {
+        "partner_ids": client.call("res.partner", "search", [("customer_rank", ">", 0)], limit=500)
+        or client.call("res.partner", "search", [], limit=500),
+        "product_ids": client.call("product.product", "search", [("sale_ok", "=", True)], limit=200),
+        "carrier_ids": client.call("ops.shipping.carrier", "search", [
+            ("is_internal", "=", False),
+            ("vendor_id", "!=", False),
+            ("service_product_id", "!=", False),
+        ]),
+    }
+
+
+def order_vals(rnd, dataset):
+    promised = datetime.now() + timedelta(days=rnd.randint(3, 20))
+    vals = {
+        "partner_id": rnd.choice(dataset["partner_ids"]),
+        "commitment_date": promised.strftime("%Y-%m-%d %H:%M:%S"),
+        "order_line": [
+            (0, 0, {"product_id": rnd.choice(dataset["product_ids"]), "product_uom_qty": rnd.randint(1, 5)})
+            for _l in range(rnd.randint(1, 4))
+        ],
+    }
+    # Some orders are left without a carrier for action_ops_auto_assign_carrier
+    if dataset["carrier_ids"] and rnd.random() < 0.8:
+        vals["shipping_carrier_id"] = rnd.choice(dataset["carrier_ids"])
+    return vals
+
+
+# =========================================================
+# Workers
+# =========================================================
+def planner_worker(client, stats, stop, think_time, drag_ratio, page_size):
+    rnd = random.Random()
+    while not stop.is_set():
+        groups = stats.measure(
+            "web_read_group", client.call, "sale.order", "web_read_group",
+            PIPELINE_DOMAIN, ["ops_stage_id"], ["ops_stage_id"], lazy=True,
+        ) or {}
+        card_ids = []
+        for group in groups.get("groups", []):
+            if group.get("__fold"):
+                # The kanban does not load folded columns (Delivered / On Hold)
+                continue
+            stage = group.get("ops_stage_id")
+            domain = PIPELINE_DOMAIN + [("ops_stage_id", "=", stage[0] if stage else False)]
+            res = stats.measure(
+                "web_search_read", client.call, "sale.order", "web_search_read",
+                domain, KANBAN_SPEC, limit=page_size,
+            ) or {}
+            card_ids.extend(rec["id"] for rec in res.get("records", []))
+
+        stage_ids = [g["ops_stage_id"][0] for g in groups.get("groups", []) if g.get("ops_stage_id")]
+        if card_ids and stage_ids and rnd.random() < drag_ratio:
+            stats.measure(
+                "stage_drag", client.call, "sale.order", "write",
+                [rnd.choice(card_ids)], {"ops_stage_id": rnd.choice(stage_ids)},
+            )
+        stop.wait(think_time * rnd.uniform(0.5, 1.5))
+
+
+def seller_worker(client, stats, stop, dataset, burst_size, burst_interval):
+    rnd = random.Random()
+    while not stop.is_set():
+        vals = [order_vals(rnd, dataset) for _i in range(burst_size)]
+        order_ids = stats.measure("create", client.call, "sale.order", "create", vals)
+        if order_ids:
+            stats.measure("action_confirm", client.call, "sale.order", "action_confirm", order_ids)
+        stop.wait(burst_interval * rnd.uniform(0.5, 1.5))
+
+
+def _client(args):
+    client = OdooClient(args.url, args.db, args.login, args.password, timeout=args.timeout)
+    client.authenticate()
+    return client
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8069")
+    parser.add_argument("--db", required=True)
+    parser.add_argument("--login", default="admin")
+    parser.add_argument("--password", default="admin")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0, help="number of orders to create before the run")
+    parser.add_argument("--planners", type=int, default=50)
+    parser.add_argument("--sellers", type=int, default=5)
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds")
+    parser.add_argument("--think-time", type=float, default=5.0, help="seconds between planner refreshes")
+    parser.add_argument("--drag-ratio", type=float, default=0.3)
+    parser.add_argument("--page-size", type=int, default=40, help="cards loaded per kanban column")
+    parser.add_argument("--burst-size", type=int, default=20)
+    parser.add_argument("--burst-interval", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    admin = _client(args)
+    dataset = seed(admin, args.seed) if args.seed else load_dataset(admin)
+    if not dataset["partner_ids"] or not dataset["product_ids"]:
+        parser.error("no partners/products found: run with --seed N first")
+
+    stats = Stats()
+    stop = threading.Event()
+    threads = []
+    for _i in range(args.planners):
+        threads.append(threading.Thread(
+            target=planner_worker,
+            args=(_client(args), stats, stop, args.think_time, args.drag_ratio, args.page_size),
+            daemon=True,
+        ))
+    for _i in range(args.sellers):
+        threads.append(threading.Thread(
+            target=seller_worker,
+            args=(_client(args), stats, stop, dataset, args.burst_size, args.burst_interval),
+            daemon=True,
+        ))
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    try:
+        stop.wait(args.duration)
+    except KeyboardInterrupt:
+        pass
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=args.timeout)
+    duration = time.perf_counter() - start
+
+    print("\n%d planners, %d sellers, %.0fs\n" % (args.planners, args.sellers, duration))
+    stats.report(duration)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())